@@ -1,63 +1,84 @@
 import zlib
-import pickle
 import sys
 import os
-import pprint
 import io
+import pickletools
+from archi_decoder import PlaceholderObject, SafeUnpickler, ZlibStream
 
-class PlaceholderObject:
-    """
-    A base class for dynamically created placeholders.
-    It captures initialization arguments and state so you can see the data
-    even if the original source code class is missing.
-    """
-    def __init__(self, *args, **kwargs):
-        self._args = args
-        self._kwargs = kwargs
-        self._state = None
-
-    def __repr__(self):
-        cls = self.__class__
-        state_repr = ""
-        if self._state:
-            # simplify state display if it's large
-            state_repr = f" state={str(self._state)[:100]}..." if len(str(self._state)) > 100 else f" state={self._state!r}"
-        
-        args_repr = ""
-        if self._args:
-            args_repr = f" args={self._args!r}"
-
-        return f"<{cls.__module__}.{cls.__name__}{args_repr}{state_repr}>"
-    
-    def __setstate__(self, state):
-        self._state = state
+_NESTED_TYPES = (dict, list, tuple, set, frozenset, PlaceholderObject)
+_BRACKETS = {list: ("[", "]"), tuple: ("(", ")"), set: ("{", "}"), frozenset: ("frozenset({", "})")}
 
-class SafeUnpickler(pickle.Unpickler):
+def dump_readable(obj, write, indent="", path=None):
     """
-    A custom unpickler that handles missing classes by generating
-    dynamic replacement classes on the fly.
+    Writes an indented text dump of obj through write() as it goes.
+    Containers holding other containers get one entry per line,
+    everything else is written with repr() on a single line.
+    path holds the ids of the containers being dumped above obj, so a
+    reference cycle is written as a recursion marker like pprint does.
     """
-    def __init__(self, file, **kwargs):
-        super().__init__(file, **kwargs)
-        self.known_placeholders = {}
+    if not isinstance(obj, _NESTED_TYPES):
+        write(repr(obj))
+        return
+    if path is None:
+        path = set()
+    obj_id = id(obj)
+    if obj_id in path:
+        write(f"<Recursion on {type(obj).__name__} with id={obj_id}>")
+        return
+    path.add(obj_id)
+
+    if isinstance(obj, dict):
+        if not obj:
+            write("{}")
+        else:
+            inner = indent + "  "
+            write("{\n")
+            for key, value in obj.items():
+                write(inner)
+                write(repr(key))
+                write(": ")
+                dump_readable(value, write, inner, path)
+                write(",\n")
+            write(indent)
+            write("}")
+    elif isinstance(obj, PlaceholderObject):
+        cls = obj.__class__
+        write("<")
+        write(cls.__module__)
+        write(".")
+        write(cls.__name__)
+        # NEWOBJ (e.g. NamedTuples like NetworkSlot) keeps all its data in the constructor arguments
+        new_args = getattr(obj, "_new_args", None)
+        if new_args:
+            write(" new_args=")
+            dump_readable(new_args, write, indent, path)
+        args = getattr(obj, "_args", None)
+        # A plain call (REDUCE) passes the same arguments to __new__ and __init__, show them once
+        if args and args != new_args:
+            write(" args=")
+            dump_readable(args, write, indent, path)
+        state = getattr(obj, "_state", None)
+        if state:
+            write(" state=")
+            dump_readable(state, write, indent, path)
+        write(">")
+    elif type(obj) in _BRACKETS and any(isinstance(item, _NESTED_TYPES) for item in obj):
+        opening, closing = _BRACKETS[type(obj)]
+        inner = indent + "  "
+        write(opening)
+        write("\n")
+        for item in obj:
+            write(inner)
+            dump_readable(item, write, inner, path)
+            write(",\n")
+        write(indent)
+        write(closing)
+    else:
+        write(repr(obj))
 
-    def find_class(self, module, name):
-        try:
-            return super().find_class(module, name)
-        except (ImportError, AttributeError):
-            key = (module, name)
-            if key not in self.known_placeholders:
-                # Create the dynamic class with the correct name and module
-                # This satisfies the NEWOBJ opcode requirement.
-                new_class = type(name, (PlaceholderObject,), {
-                    "__module__": module,
-                    "__doc__": f"Dynamic placeholder for {module}.{name}"
-                })
-                self.known_placeholders[key] = new_class
-            
-            return self.known_placeholders[key]
+    path.discard(obj_id)
 
-def decode_file(input_path):
+def decode_file(input_path, save_raw=False):
     if not os.path.exists(input_path):
         print(f"Error: File not found: {input_path}")
         return
@@ -65,53 +86,72 @@ def decode_file(input_path):
     print(f"Processing {input_path}...")
 
     try:
-        with open(input_path, 'rb') as f:
-            raw_data = f.read()
-
-        if not raw_data:
-             print("Error: File is empty.")
-             return
-
-        # Step 1: Check Format Version (First Byte)
-        format_version = raw_data[0]
-        print(f"Format Version: {format_version}")
-
-        # Step 2: Decompress (Zlib)
-        try:
+        with open(input_path, 'rb', buffering=1 << 20) as f:
+            # Step 1: Check Format Version (First Byte)
+            header = f.read(1)
+            if not header:
+                 print("Error: File is empty.")
+                 return
+
+            format_version = header[0]
+            print(f"Format Version: {format_version}")
+
+            # --- Optionally save the raw decompressed file first ---
+            # pickletools.optimize drops unused MEMOIZE opcodes, so every later
+            # load of the saved file by the other scripts is smaller and faster.
+            raw_output_path = input_path + ".raw.pickle"
+            decompressed_data = None
+            raw_saved = False
+            if save_raw:
+                try:
+                    decompressed_data = ZlibStream(f).readall()
+                except zlib.error as e:
+                    print(f"Error: Zlib decompression failed. {e}")
+                    return
+                try:
+                    decompressed_data = pickletools.optimize(decompressed_data)
+                except Exception as e:
+                    print(f"Warning: Could not optimize the raw pickle, saving it as is. {e}")
+                try:
+                    with open(raw_output_path, 'wb') as raw_out:
+                        raw_out.write(decompressed_data)
+                except OSError as e:
+                    print(f"Warning: Could not write raw pickle file. {e}")
+                else:
+                    raw_saved = True
+                    print(f"SUCCESS: Raw decompressed file saved to: {raw_output_path}")
+                    print("You can use this .pickle file with other tools or scripts.")
+            # -------------------------------------------------------
+
+            # Step 2 + 3: Decompress (Zlib) straight into the Custom Unpickler
             # MultiServer.py skips the first byte (version) before decompressing
-            decompressed_data = zlib.decompress(raw_data[1:])
-        except zlib.error as e:
-            print(f"Error: Zlib decompression failed. {e}")
-            return
-
-        # --- NEW: Save the raw decompressed file immediately ---
-        raw_output_path = input_path + ".raw.pickle"
-        try:
-            with open(raw_output_path, 'wb') as raw_out:
-                raw_out.write(decompressed_data)
-            print(f"SUCCESS: Raw decompressed file saved to: {raw_output_path}")
-            print("You can use this .pickle file with other tools or scripts.")
-        except Exception as e:
-            print(f"Warning: Could not write raw pickle file. {e}")
-        # -------------------------------------------------------
-
-        # Step 3: Deserialize (Pickle with Custom Unpickler)
-        print("Attempting to generate readable text format...")
-        try:
-            file_buffer = io.BytesIO(decompressed_data)
-            unpickler = SafeUnpickler(file_buffer)
-            data = unpickler.load()
-            
-            # Step 4: Write to Text Output File
-            text_output_path = input_path + ".decoded.txt"
-            with open(text_output_path, 'w', encoding='utf-8') as out_f:
-                pprint.pprint(data, stream=out_f, width=120, indent=2)
-            print(f"SUCCESS: Readable text dump saved to: {text_output_path}")
-
-        except Exception as e:
-            print(f"\nWarning: Could not generate readable text dump due to object complexity.")
-            print(f"Error details: {e}")
-            print(f"However, the raw file '{raw_output_path}' was generated successfully.")
+            print("Attempting to generate readable text format...")
+            try:
+                if decompressed_data is not None:
+                    # Already inflated for --save-raw, don't decompress the file a second time
+                    stream = io.BytesIO(decompressed_data)
+                else:
+                    stream = io.BufferedReader(ZlibStream(f), buffer_size=1 << 20)
+                unpickler = SafeUnpickler(stream)
+                data = unpickler.load()
+
+                # Step 4: Write to Text Output File
+                text_output_path = input_path + ".decoded.txt"
+                with open(text_output_path, 'w', encoding='utf-8', buffering=1 << 20) as out_f:
+                    dump_readable(data, out_f.write)
+                    out_f.write("\n")
+                print(f"SUCCESS: Readable text dump saved to: {text_output_path}")
+
+            except zlib.error as e:
+                print(f"Error: Zlib decompression failed. {e}")
+
+            except Exception as e:
+                print(f"\nWarning: Could not generate readable text dump due to object complexity.")
+                print(f"Error details: {e}")
+                if raw_saved:
+                    print(f"However, the raw file '{raw_output_path}' was generated successfully.")
+                elif not save_raw:
+                    print("Run again with --save-raw to keep the decompressed pickle for other tools.")
 
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
@@ -119,10 +159,12 @@ def decode_file(input_path):
         traceback.print_exc()
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python decode_archipelago.py <path_to_file.archipelago>")
+    args = [arg for arg in sys.argv[1:] if arg != "--save-raw"]
+    if not args:
+        print("Usage: python decode_archipelago.py <path_to_file.archipelago> [--save-raw]")
         print("You can also drag and drop the file onto this script.")
+        print("--save-raw also writes the decompressed pickle next to the input file.")
         input("Press Enter to exit...")
     else:
-        file_path = sys.argv[1]
-        decode_file(file_path)
\ No newline at end of file
+        file_path = args[0]
+        decode_file(file_path, save_raw="--save-raw" in sys.argv)
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Shared decoding for the scripts in this folder.
+
+Deserialize.py, read_pickle.py and the sphere readers all get their placeholder
+classes and loaders from here. A file read by several of them in one session
+is only read and decompressed once.
+"""
+import zlib
+from _pickle import Unpickler as _CUnpickler  # C accelerator, find_class overrides still apply
+import os
+import io
+import mmap
+import functools
+
+class PlaceholderObject:
+    """
+    A base class for dynamically created placeholders.
+    It captures initialization arguments and state so you can see the data
+    even if the original source code class is missing.
+    """
+    # __dict__ stays available for the attributes promoted in __setstate__
+    __slots__ = ('_args', '_kwargs', '_state', '_new_args', '_new_kwargs', '__dict__')
+
+    # Capture data passed to __new__ (Constructor)
+    # This is required if pickle uses NEWOBJ with arguments.
+    # Pickle may skip __init__ then, so the other slots get defaults here.
+    def __new__(cls, *args, **kwargs):
+        obj = super().__new__(cls)
+        obj._new_args = args
+        obj._new_kwargs = kwargs
+        obj._args = ()
+        obj._kwargs = {}
+        obj._state = None
+        return obj
+
+    def __init__(self, *args, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._state = None
+
+    def __repr__(self):
+        cls = self.__class__
+        state_repr = ""
+        if self._state:
+            # simplify state display if it's large
+            state_repr = f" state={str(self._state)[:100]}..." if len(str(self._state)) > 100 else f" state={self._state!r}"
+
+        args_repr = ""
+        if self._args:
+            args_repr = f" args={self._args!r}"
+
+        return f"<{cls.__module__}.{cls.__name__}{args_repr}{state_repr}>"
+
+    def __setstate__(self, state):
+        self._state = state
+        # Promote the state into real attributes once, so later lookups
+        # don't need a __getattr__ fallback.
+        # State is either a dict or a (dict_state, slot_state) tuple.
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+        elif isinstance(state, tuple) and len(state) == 2:
+            for part in state:
+                if isinstance(part, dict):
+                    self.__dict__.update(part)
+
+class SafeUnpickler(_CUnpickler):
+    """
+    A custom unpickler that handles missing classes by generating
+    dynamic replacement classes on the fly.
+    """
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        self._class_cache = {} # { (module, name): real class or placeholder }
+
+    def find_class(self, module, name):
+        key = (module, name)
+        cls = self._class_cache.get(key)
+        if cls is None:
+            try:
+                cls = super().find_class(module, name)
+            except (ImportError, AttributeError):
+                # Create the dynamic class with the correct name and module
+                # This satisfies the NEWOBJ opcode requirement.
+                cls = type(name, (PlaceholderObject,), {
+                    "__module__": module,
+                    "__slots__": (),
+                    "__doc__": f"Dynamic placeholder for {module}.{name}"
+                })
+            self._class_cache[key] = cls
+        return cls
+
+# WorldPicker.py has a standalone copy of ZlibStream and is_compressed, keep them in sync
+class ZlibStream(io.RawIOBase):
+    """
+    A read-only stream that inflates a zlib payload from another file on demand.
+    This lets the unpickler consume the data without the whole decompressed
+    file ever being held in memory.
+    """
+    CHUNK_SIZE = 1 << 18
+
+    def __init__(self, source):
+        self._source = source
+        self._decompressor = zlib.decompressobj()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # zlib treats max_length=0 as "no limit", which would inflate the whole rest at once
+        if not len(buffer):
+            return 0
+        while not self._decompressor.eof:
+            if not self._pending:
+                self._pending = self._source.read(self.CHUNK_SIZE)
+                if not self._pending:
+                    raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
+            data = self._decompressor.decompress(self._pending, len(buffer))
+            self._pending = self._decompressor.unconsumed_tail
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+        return 0
+
+def is_compressed(header):
+    """
+    Tells an .archipelago file (format version byte, then a zlib stream)
+    apart from an already decompressed pickle by its first two bytes.
+    """
+    # Pickles from protocol 2 on start with the PROTO opcode, zlib streams with 0x78
+    return len(header) >= 2 and header[0] != 0x80 and header[1] == 0x78
+
+@functools.lru_cache(maxsize=4)
+def _load_bytes(path, mtime, size):
+    # mtime and size are only part of the cache key, so a changed file is read again
+    if not size:
+        return b""  # mmap can't map an empty file
+    # Map the file instead of reading it, so the compressed data is never copied into a bytes object
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            if is_compressed(view[:2]):
+                # MultiServer.py skips the first byte (version) before decompressing
+                return zlib.decompress(view[1:])
+            return bytes(view)
+
+def load_bytes(path):
+    """Returns the pickle bytes of an .archipelago file or raw pickle, decompressed if needed."""
+    stat = os.stat(path)
+    return _load_bytes(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+def load(path):
+    """Loads an .archipelago file or raw pickle with the SafeUnpickler."""
+    return SafeUnpickler(io.BytesIO(load_bytes(path))).load()
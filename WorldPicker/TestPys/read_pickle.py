@@ -1,37 +1,7 @@
-import pickle
 import pprint
 import os
 import sys
-
-# --- Copying the SafeUnpickler class so this script works standalone ---
-class PlaceholderObject:
-    def __init__(self, *args, **kwargs):
-        self._args = args
-        self._kwargs = kwargs
-        self._state = None
-    def __repr__(self):
-        # Return a clean representation of the class
-        return f"<{self.__class__.__module__}.{self.__class__.__name__}>"
-    def __setstate__(self, state):
-        self._state = state
-
-class SafeUnpickler(pickle.Unpickler):
-    def __init__(self, file, **kwargs):
-        super().__init__(file, **kwargs)
-        self.known_placeholders = {}
-    def find_class(self, module, name):
-        try:
-            return super().find_class(module, name)
-        except (ImportError, AttributeError):
-            key = (module, name)
-            if key not in self.known_placeholders:
-                # Create a dynamic class that inherits from PlaceholderObject
-                new_class = type(name, (PlaceholderObject,), {
-                    "__module__": module
-                })
-                self.known_placeholders[key] = new_class
-            return self.known_placeholders[key]
-# -----------------------------------------------------------------------
+from archi_decoder import load
 
 def load_my_pickle(file_path):
     if not os.path.exists(file_path):
@@ -40,9 +10,8 @@ def load_my_pickle(file_path):
 
     print(f"Loading: {file_path}")
     try:
-        with open(file_path, 'rb') as f:
-            # Use SafeUnpickler instead of pickle.load(f)
-            data = SafeUnpickler(f).load()
+        # Uses the SafeUnpickler instead of pickle.load(f), also accepts .archipelago files
+        data = load(file_path)
         
         print("Data loaded successfully!")
         print("-" * 40)
@@ -1,112 +1,102 @@
-import pickle
 import pprint
 import os
 import sys
 import pickletools
 import io
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, repeat
+from archi_decoder import SafeUnpickler, load_bytes
+
+# Each strategy gets the name/game found so far and returns them, updated if it found anything
+# Strategy 1: Standard Attributes
+def _player_info_from_attributes(slot_obj, p_name, p_game):
+    return getattr(slot_obj, 'name', None) or p_name, getattr(slot_obj, 'game', None) or p_game
+
+# Strategy 2: __new__ arguments (Likely for NetworkSlot)
+def _player_info_from_new_args(slot_obj, p_name, p_game):
+    new_args = getattr(slot_obj, '_new_args', None)
+    if new_args and len(new_args) >= 2:
+        return new_args[0], new_args[1]
+    return p_name, p_game
+
+# Strategy 3: State Dict
+def _player_info_from_state(slot_obj, p_name, p_game):
+    state = getattr(slot_obj, '_state', None)
+    if isinstance(state, dict):
+        return state.get('name', p_name), state.get('game', p_game)
+    return p_name, p_game
 
-# --- Placeholder Object ---
-class PlaceholderObject:
-    # CRITICAL CHANGE: Capture data passed to __new__ (Constructor)
-    # This is required if pickle uses NEWOBJ with arguments.
-    def __new__(cls, *args, **kwargs):
-        obj = super().__new__(cls)
-        obj._new_args = args
-        obj._new_kwargs = kwargs
-        return obj
-
-    def __init__(self, *args, **kwargs):
-        self._init_args = args
-        self._init_kwargs = kwargs
-        self._state = None
-    
-    def __getattr__(self, name):
-        if name.startswith("__"): raise AttributeError(name)
-
-        # 1. Check _state
-        state = self.__dict__.get("_state")
-        if isinstance(state, dict) and name in state: return state[name]
-        if isinstance(state, tuple) and len(state) == 2:
-            if isinstance(state[0], dict) and name in state[0]: return state[0][name]
-            if isinstance(state[1], dict) and name in state[1]: return state[1][name]
-
-        # 2. Check _new_args (Data passed to constructor)
-        new_args = self.__dict__.get("_new_args")
-        if new_args and isinstance(new_args, tuple):
-            if name == 'name' and len(new_args) >= 1: return new_args[0]
-            if name == 'game' and len(new_args) >= 2: return new_args[1]
-
-        raise AttributeError(f"'{self.__class__.__name__}' placeholder has no attribute '{name}'")
-
-    def __repr__(self):
-        return f"<{self.__class__.__module__}.{self.__class__.__name__}>"
-    
-    def __setstate__(self, state):
-        self._state = state
-
-class SafeUnpickler(pickle.Unpickler):
-    def __init__(self, file, **kwargs):
-        super().__init__(file, **kwargs)
-        self.known_placeholders = {}
-    
-    def find_class(self, module, name):
-        try:
-            return super().find_class(module, name)
-        except (ImportError, AttributeError):
-            key = (module, name)
-            if key not in self.known_placeholders:
-                new_class = type(name, (PlaceholderObject,), {
-                    "__module__": module
-                })
-                self.known_placeholders[key] = new_class
-            return self.known_placeholders[key]
-# -----------------------------------------------------------------------
+_PLAYER_INFO_STRATEGIES = (_player_info_from_attributes, _player_info_from_new_args, _player_info_from_state)
+_player_info_resolvers = {} # { SlotClass: strategy that found the name for the first slot of that class }
 
 def resolve_player_info(slot_obj, slot_id):
+    # Slots of the same class store their data the same way, so only the first one has to probe
+    resolver = _player_info_resolvers.get(type(slot_obj))
+    if resolver is not None:
+        p_name, p_game = resolver(slot_obj, "Unknown", "Unknown")
+        if p_name != "Unknown":
+            return p_name, p_game
+
     p_name = "Unknown"
     p_game = "Unknown"
-
-    # Strategy 1: Standard Attributes
-    if hasattr(slot_obj, 'name') and slot_obj.name: p_name = slot_obj.name
-    if hasattr(slot_obj, 'game') and slot_obj.game: p_game = slot_obj.game
-
-    # Strategy 2: __new__ arguments (Likely for NetworkSlot)
-    if p_name == "Unknown":
-        new_args = getattr(slot_obj, '_new_args', None)
-        if new_args and len(new_args) >= 2:
-            p_name = new_args[0]
-            p_game = new_args[1]
-
-    # Strategy 3: State Dict
-    if p_name == "Unknown":
-        state = getattr(slot_obj, '_state', None)
-        if isinstance(state, dict):
-            p_name = state.get('name', p_name)
-            p_game = state.get('game', p_game)
+    for strategy in _PLAYER_INFO_STRATEGIES:
+        p_name, p_game = strategy(slot_obj, p_name, p_game)
+        if p_name != "Unknown":
+            _player_info_resolvers[type(slot_obj)] = strategy
+            break
 
     return p_name, p_game
 
-def analyze_pickle_stream(file_path):
-    """Uses pickletools to print the first few ops if extraction fails."""
+def analyze_pickle_stream(content):
+    """Uses pickletools to print the first few ops of the already loaded bytes if extraction fails."""
     print("\n" + "!"*60)
     print("[DEBUG] Running pickletools analysis to diagnose data format...")
     try:
-        with open(file_path, "rb") as f:
-            content = f.read(500) 
-            try:
-                gen = pickletools.genops(content)
-                print("--- Pickle Opcodes (First 500 bytes) ---")
-                for op in gen:
-                    print(f"{op[0].name} {op[1] if op[1] is not None else ''}")
-                    if op[1] == 'NetworkSlot':
-                        print("... (Found NetworkSlot, stopping trace) ...")
-                        break
-            except Exception as e:
-                print(f"Analysis error: {e}")
+        gen = pickletools.genops(io.BytesIO(content))
+        print("--- Pickle Opcodes (First 500 bytes, at most 100 ops) ---")
+        found_slot = False
+        for opcode, arg, pos in islice(gen, 100):
+            print(f"{opcode.name} {arg if arg is not None else ''}")
+            if isinstance(arg, str) and 'NetworkSlot' in arg:
+                found_slot = True
+            # Stop once the NetworkSlot class itself is loaded or built
+            if found_slot and opcode.name in ('GLOBAL', 'STACK_GLOBAL', 'NEWOBJ'):
+                print("... (Found NetworkSlot, stopping trace) ...")
+                break
     except Exception as e:
-        print(f"Could not read file for analysis: {e}")
+        print(f"Analysis error: {e}")
     print("!"*60 + "\n")
 
+# Report line templates, %-formatting each line is a single C call
+SPHERE_HEADER = "--- Sphere %d ---\n"
+EMPTY_SPHERE = "--- Sphere %d ---\n  (Empty Sphere)\n"
+PLAYER_LINE = "  Player: %s (%s)\n"
+LOCATION_LINE = "    - %s\n"
+UNKNOWN_LOCATION = "Unknown ID %s"
+
+def render_sphere(sphere_number, sphere, player_headers, player_loc_maps):
+    """Formats one presorted sphere of the report as a single string."""
+    if not sphere:
+        return EMPTY_SPHERE % sphere_number
+
+    parts = [SPHERE_HEADER % sphere_number]
+    append = parts.append
+    for player_id, location_ids in sphere:
+        header = player_headers.get(player_id)
+        if header is None:
+            header = PLAYER_LINE % (f"Player {player_id}", 'Unknown')
+        append(header)
+        
+        loc_map = player_loc_maps.get(player_id, {})
+        for loc_id in location_ids:
+            loc_name = loc_map.get(loc_id)
+            if loc_name is None:
+                loc_name = UNKNOWN_LOCATION % loc_id
+            append(LOCATION_LINE % loc_name)
+        append("\n")
+    append("\n")
+    return "".join(parts)
+
 def extract_readable_spheres(file_path):
     if not os.path.exists(file_path):
         print(f"Error: File not found at path: {file_path}")
@@ -114,8 +104,9 @@ def extract_readable_spheres(file_path):
 
     print(f"Loading: {file_path}")
     try:
-        with open(file_path, 'rb') as f:
-            data = SafeUnpickler(f).load()
+        # Whole (decompressed) file in memory, also kept for the debug trace below
+        buf = load_bytes(file_path)
+        data = SafeUnpickler(io.BytesIO(buf)).load()
         
         print("Data loaded successfully.")
         
@@ -130,7 +121,7 @@ def extract_readable_spheres(file_path):
             for game_name, game_data in data['datapackage'].items():
                 if 'location_name_to_id' in game_data:
                     name_to_id = game_data['location_name_to_id']
-                    id_to_name = {v: k for k, v in name_to_id.items()}
+                    id_to_name = dict(zip(name_to_id.values(), name_to_id.keys()))
                     location_db[game_name] = id_to_name
 
         # --- 2. Build Player Database ---
@@ -144,13 +135,21 @@ def extract_readable_spheres(file_path):
 
                 if (p_name == "Unknown" or p_game == "Unknown") and not extraction_failed:
                     print(f"\n[FAILURE] Could not resolve info for Slot {slot_id}")
-                    print(f"Object internals: {slot_obj.__dict__}")
+                    print(f"Object internals: _new_args={getattr(slot_obj, '_new_args', 'N/A')!r} _state={getattr(slot_obj, '_state', 'N/A')!r} attributes={getattr(slot_obj, '__dict__', 'N/A')}")
                     extraction_failed = True
 
                 player_db[slot_id] = {'name': p_name, 'game': p_game}
 
         if extraction_failed:
-            analyze_pickle_stream(file_path)
+            # The opcode trace is only useful when debugging the unpickler itself
+            if os.environ.get('SPHERE_DEBUG'):
+                analyze_pickle_stream(memoryview(buf)[:500])
+            else:
+                print("Set SPHERE_DEBUG=1 to print a pickletools trace of the file.")
+
+        # Per player lookups, these don't change from sphere to sphere
+        player_headers = {player_id: PLAYER_LINE % (info['name'], info['game']) for player_id, info in player_db.items()}
+        player_loc_maps = {player_id: location_db.get(info['game'], {}) for player_id, info in player_db.items()}
 
         # --- 3. Generate Readable Report ---
         spheres_data = data['spheres']
@@ -159,29 +158,26 @@ def extract_readable_spheres(file_path):
         
         print(f"Translating {len(spheres_data)} spheres...")
 
-        with open(output_file, "w", encoding="utf-8") as out:
+        # Sort every sphere once up front, render_sphere only has to format.
+        # Spheres hold sets of location IDs, so there is no existing order to reuse.
+        sorted_spheres = [
+            [(player_id, sorted(location_ids)) for player_id, location_ids in sorted(sphere.items())]
+            for sphere in spheres_data
+        ]
+
+        with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as out:
             out.write(f"=== READABLE SPHERES REPORT ===\n")
             out.write(f"Source: {os.path.basename(file_path)}\n")
             out.write(f"Total Spheres: {len(spheres_data)}\n")
             out.write("="*60 + "\n\n")
 
-            for i, sphere in enumerate(spheres_data):
-                out.write(f"--- Sphere {i + 1} ---\n")
-                if not sphere:
-                    out.write("  (Empty Sphere)\n")
-                    continue
-
-                for player_id in sorted(sphere.keys()):
-                    location_ids = sphere[player_id]
-                    p_info = player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
-                    out.write(f"  Player: {p_info['name']} ({p_info['game']})\n")
-                    
-                    loc_map = location_db.get(p_info['game'], {})
-                    for loc_id in sorted(location_ids):
-                        loc_name = loc_map.get(loc_id, f"Unknown ID {loc_id}")
-                        out.write(f"    - {loc_name}\n")
-                    out.write("\n")
-                out.write("\n")
+            # Spheres only depend on the per player lookups, so they are formatted
+            # by a worker pool and written back here in order.
+            with ThreadPoolExecutor() as executor:
+                blocks = executor.map(render_sphere, range(1, len(sorted_spheres) + 1), sorted_spheres,
+                                      repeat(player_headers), repeat(player_loc_maps))
+                for block in blocks:
+                    out.write(block)
 
         print(f"SUCCESS: Readable report written to: {output_file}")
 
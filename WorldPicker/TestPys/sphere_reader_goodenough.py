@@ -1,89 +1,94 @@
-import pickle
 import pprint
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from archi_decoder import load
+
+# 1. Check _state directly
+def _attribute_from_state(obj, attr_name):
+    state = getattr(obj, '_state', None)
+    if isinstance(state, dict):
+        return state.get(attr_name)
+    elif isinstance(state, tuple) and len(state) == 2:
+        # Check both parts of the tuple
+        if isinstance(state[0], dict) and attr_name in state[0]: return state[0][attr_name]
+        if isinstance(state[1], dict) and attr_name in state[1]: return state[1][attr_name]
+    return None
 
-# --- Placeholder Object to capture missing class data ---
-class PlaceholderObject:
-    def __init__(self, *args, **kwargs):
-        self._args = args
-        self._kwargs = kwargs
-        self._state = None
-    
-    def __getattr__(self, name):
-        # Access _state safely
-        state = self.__dict__.get("_state")
-        
-        # Case 1: State is a simple dictionary
-        if isinstance(state, dict) and name in state:
-            return state[name]
-        
-        # Case 2: State is a tuple (common for objects with __slots__)
-        # Format is typically (dict_state, slot_state)
-        if isinstance(state, tuple) and len(state) == 2:
-            dict_state, slot_state = state
-            if isinstance(dict_state, dict) and name in dict_state:
-                return dict_state[name]
-            if isinstance(slot_state, dict) and name in slot_state:
-                return slot_state[name]
-
-        raise AttributeError(f"'{self.__class__.__name__}' placeholder has no attribute '{name}'")
-
-    def __repr__(self):
-        return f"<{self.__class__.__module__}.{self.__class__.__name__}>"
-    
-    def __setstate__(self, state):
-        self._state = state
-
-class SafeUnpickler(pickle.Unpickler):
-    def __init__(self, file, **kwargs):
-        super().__init__(file, **kwargs)
-        self.known_placeholders = {}
-    
-    def find_class(self, module, name):
-        try:
-            return super().find_class(module, name)
-        except (ImportError, AttributeError):
-            key = (module, name)
-            if key not in self.known_placeholders:
-                new_class = type(name, (PlaceholderObject,), {
-                    "__module__": module
-                })
-                self.known_placeholders[key] = new_class
-            return self.known_placeholders[key]
-# -----------------------------------------------------------------------
+# 2. Check _args (Constructor arguments)
+# Sometimes objects like NamedTuples store data in _args.
+# We make a best guess based on order.
+# NetworkSlot usually: (name, game, type, ...)
+def _attribute_from_args(obj, attr_name):
+    args = getattr(obj, '_args', None)
+    if args and isinstance(args, tuple):
+        if attr_name == 'name' and len(args) >= 1: return args[0]
+        if attr_name == 'game' and len(args) >= 2: return args[1]
+    return None
+
+# 3. Try direct attribute access (state promoted by __setstate__)
+def _attribute_from_getattr(obj, attr_name):
+    return getattr(obj, attr_name, None)
+
+_ATTRIBUTE_STRATEGIES = (_attribute_from_state, _attribute_from_args, _attribute_from_getattr)
+_attribute_resolvers = {} # { (Class, attr_name): strategy that found the attribute first }
 
 def resolve_attribute(obj, attr_name):
     """
     Tries to find an attribute in a PlaceholderObject using various pickle storage methods.
+    The strategy that works is remembered per class, so later objects skip the probing.
     """
-    # 1. Try direct attribute access (via __getattr__)
-    try:
-        val = getattr(obj, attr_name)
+    key = (type(obj), attr_name)
+    resolver = _attribute_resolvers.get(key)
+    if resolver is not None:
+        val = resolver(obj, attr_name)
         if val is not None: return val
-    except AttributeError:
-        pass
-
-    # 2. Check _state directly
-    if hasattr(obj, '_state'):
-        state = obj._state
-        if isinstance(state, dict):
-            return state.get(attr_name)
-        elif isinstance(state, tuple) and len(state) == 2:
-            # Check both parts of the tuple
-            if isinstance(state[0], dict) and attr_name in state[0]: return state[0][attr_name]
-            if isinstance(state[1], dict) and attr_name in state[1]: return state[1][attr_name]
-
-    # 3. Check _args (Constructor arguments)
-    # Sometimes objects like NamedTuples store data in _args.
-    # We make a best guess based on order.
-    # NetworkSlot usually: (name, game, type, ...)
-    if hasattr(obj, '_args') and obj._args and isinstance(obj._args, tuple):
-        if attr_name == 'name' and len(obj._args) >= 1: return obj._args[0]
-        if attr_name == 'game' and len(obj._args) >= 2: return obj._args[1]
+
+    for strategy in _ATTRIBUTE_STRATEGIES:
+        val = strategy(obj, attr_name)
+        if val is not None:
+            _attribute_resolvers[key] = strategy
+            return val
 
     return None
 
+# Report line templates, %-formatting each line is a single C call
+SPHERE_HEADER = "--- Sphere %d ---\n"
+EMPTY_SPHERE = "--- Sphere %d ---\n  (Empty Sphere)\n"
+PLAYER_LINE = "  Player: %s (%s)\n"
+LOCATION_LINE = "    - %s\n"
+UNKNOWN_LOCATION = "Unknown ID %s"
+
+def render_sphere(sphere_number, sphere, player_headers, player_loc_maps):
+    """
+    Formats one presorted sphere of the report as a single string.
+    Only reads the per player lookups, so spheres can be rendered in parallel.
+    """
+    if not sphere:
+        return EMPTY_SPHERE % sphere_number
+
+    parts = [SPHERE_HEADER % sphere_number]
+    append = parts.append
+
+    for player_id, location_ids in sphere:
+        header = player_headers.get(player_id)
+        if header is None:
+            header = PLAYER_LINE % (f"Player {player_id}", 'Unknown')
+        append(header)
+        
+        loc_map = player_loc_maps.get(player_id, {})
+        
+        for loc_id in location_ids:
+            loc_name = loc_map.get(loc_id)
+            if loc_name is None:
+                loc_name = UNKNOWN_LOCATION % loc_id
+            append(LOCATION_LINE % loc_name)
+        
+        append("\n")
+    append("\n")
+    return "".join(parts)
+
 def extract_readable_spheres(file_path):
     if not os.path.exists(file_path):
         print(f"Error: File not found at path: {file_path}")
@@ -91,8 +96,7 @@ def extract_readable_spheres(file_path):
 
     print(f"Loading: {file_path}")
     try:
-        with open(file_path, 'rb') as f:
-            data = SafeUnpickler(f).load()
+        data = load(file_path)
         
         print("Data loaded successfully.")
         
@@ -108,7 +112,7 @@ def extract_readable_spheres(file_path):
             for game_name, game_data in data['datapackage'].items():
                 if 'location_name_to_id' in game_data:
                     name_to_id = game_data['location_name_to_id']
-                    id_to_name = {v: k for k, v in name_to_id.items()}
+                    id_to_name = dict(zip(name_to_id.values(), name_to_id.keys()))
                     location_db[game_name] = id_to_name
 
         # --- 2. Build Player Database ---
@@ -136,6 +140,10 @@ def extract_readable_spheres(file_path):
 
                 player_db[slot_id] = {'name': p_name, 'game': p_game}
 
+        # Per player lookups, these don't change from sphere to sphere
+        player_headers = {player_id: PLAYER_LINE % (info['name'], info['game']) for player_id, info in player_db.items()}
+        player_loc_maps = {player_id: location_db.get(info['game'], {}) for player_id, info in player_db.items()}
+
         # --- 3. Generate Readable Report ---
         spheres_data = data['spheres']
         base_name = os.path.splitext(file_path)[0]
@@ -143,37 +151,26 @@ def extract_readable_spheres(file_path):
         
         print(f"Translating {len(spheres_data)} spheres...")
 
-        with open(output_file, "w", encoding="utf-8") as out:
+        # Sort every sphere once up front (players by ID, then locations by ID),
+        # render_sphere only has to format.
+        # Spheres hold sets of location IDs, so there is no existing order to reuse.
+        sorted_spheres = [
+            [(player_id, sorted(location_ids)) for player_id, location_ids in sorted(sphere.items())]
+            for sphere in spheres_data
+        ]
+
+        with open(output_file, "w", encoding="utf-8", buffering=1 << 20) as out:
             out.write(f"=== READABLE SPHERES REPORT ===\n")
             out.write(f"Source: {os.path.basename(file_path)}\n")
             out.write(f"Total Spheres: {len(spheres_data)}\n")
             out.write("="*60 + "\n\n")
 
-            for i, sphere in enumerate(spheres_data):
-                out.write(f"--- Sphere {i + 1} ---\n")
-                if not sphere:
-                    out.write("  (Empty Sphere)\n")
-                    continue
-
-                # Sort by player ID for consistency
-                for player_id in sorted(sphere.keys()):
-                    location_ids = sphere[player_id]
-                    
-                    p_info = player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
-                    p_name = p_info['name']
-                    p_game = p_info['game']
-                    
-                    out.write(f"  Player: {p_name} ({p_game})\n")
-                    
-                    loc_map = location_db.get(p_game, {})
-                    
-                    # Sort locations by ID
-                    for loc_id in sorted(location_ids):
-                        loc_name = loc_map.get(loc_id, f"Unknown ID {loc_id}")
-                        out.write(f"    - {loc_name}\n")
-                    
-                    out.write("\n")
-                out.write("\n")
+            # Render spheres on a worker pool, then write them back in order
+            with ThreadPoolExecutor() as executor:
+                blocks = executor.map(render_sphere, range(1, len(sorted_spheres) + 1), sorted_spheres,
+                                      repeat(player_headers), repeat(player_loc_maps))
+                for block in blocks:
+                    out.write(block)
 
         print(f"SUCCESS: Readable report written to: {output_file}")
 
@@ -2,9 +2,25 @@
 
 import zlib
 import pickle
+try:
+    from _pickle import Unpickler as _Unpickler  # C accelerator, find_class overrides still apply
+except ImportError:
+    _Unpickler = pickle.Unpickler  # e.g. PyPy, where pickle is pure python anyway
 import sys
 import os
 import io
+import mmap
+import platform
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np  # Optional, only speeds up sorting large ID collections
+except ImportError:
+    np = None
+
+# PyPy's JIT sorts plain ints faster than the round trip through NumPy arrays
+if platform.python_implementation() == 'PyPy':
+    np = None
 
 # --- Placeholder Object for Safe Unpickling ---
 class PlaceholderObject:
@@ -17,6 +33,11 @@ class PlaceholderObject:
         obj = super().__new__(cls)
         obj._new_args = args
         obj._new_kwargs = kwargs
+        # Logic specifically for NetworkSlot(name, game, type, group_members)
+        # Stored as real attributes so reading them never needs a __getattr__ fallback
+        if len(args) >= 2:
+            obj.name = args[0]
+            obj.game = args[1]
         return obj
 
     def __init__(self, *args, **kwargs):
@@ -24,72 +45,298 @@ class PlaceholderObject:
         self._init_kwargs = kwargs
         self._state = None
     
-    def __getattr__(self, name):
-        if name.startswith("__"): raise AttributeError(name)
-
-        # 1. Check _state (Standard Dict or Tuple)
-        state = self.__dict__.get("_state")
-        if isinstance(state, dict) and name in state: return state[name]
-        if isinstance(state, tuple) and len(state) == 2:
-            if isinstance(state[0], dict) and name in state[0]: return state[0][name]
-            if isinstance(state[1], dict) and name in state[1]: return state[1][name]
-
-        # 2. Check _new_args (Constructor Arguments)
-        # Logic specifically for NetworkSlot(name, game, type, group_members)
-        new_args = self.__dict__.get("_new_args")
-        if new_args and isinstance(new_args, tuple):
-            if name == 'name' and len(new_args) >= 1: return new_args[0]
-            if name == 'game' and len(new_args) >= 2: return new_args[1]
-
-        raise AttributeError(f"'{self.__class__.__name__}' placeholder has no attribute '{name}'")
-
     def __repr__(self):
         return f"<{self.__class__.__module__}.{self.__class__.__name__}>"
     
     def __setstate__(self, state):
         self._state = state
+        # Promote the state (Standard Dict or Tuple) into real attributes,
+        # it takes precedence over the constructor arguments
+        if isinstance(state, dict):
+            self.__dict__.update(state)
+        elif isinstance(state, tuple) and len(state) == 2:
+            for part in state:
+                if isinstance(part, dict):
+                    self.__dict__.update(part)
+
+# Archipelago classes every multidata file contains. They get their placeholders up front,
+# so the unpickler doesn't try (and fail) to import them first.
+PRELOADED_PLACEHOLDERS = (
+    ("NetUtils", "NetworkSlot"),
+    ("NetUtils", "SlotType"),
+    ("NetUtils", "Hint"),
+    ("NetUtils", "HintStatus"),
+)
 
-class SafeUnpickler(pickle.Unpickler):
+def make_placeholder_class(module, name):
+    return type(name, (PlaceholderObject,), {
+        "__module__": module
+    })
+
+class SafeUnpickler(_Unpickler):
     def __init__(self, file, **kwargs):
         super().__init__(file, **kwargs)
-        self.known_placeholders = {}
+        # Also serves as the cache of failed imports, each missing class is only looked up once
+        self.known_placeholders = {key: make_placeholder_class(*key) for key in PRELOADED_PLACEHOLDERS}
     
     def find_class(self, module, name):
+        key = (module, name)
+        placeholder = self.known_placeholders.get(key)
+        if placeholder is not None:
+            return placeholder
         try:
             return super().find_class(module, name)
         except (ImportError, AttributeError):
-            key = (module, name)
-            if key not in self.known_placeholders:
-                new_class = type(name, (PlaceholderObject,), {
-                    "__module__": module
-                })
-                self.known_placeholders[key] = new_class
-            return self.known_placeholders[key]
+            placeholder = self.known_placeholders[key] = make_placeholder_class(module, name)
+            return placeholder
+
+# --- Streaming Decompression ---
+# Kept in sync with TestPys/archi_decoder.py, copied here so WorldPicker.py stays a single file
+class ZlibStream(io.RawIOBase):
+    """
+    Reads an .archipelago file as the decompressed pickle stream.
+    Skips the version byte and inflates the rest in small chunks as the unpickler asks for data,
+    so neither the compressed nor the decompressed file has to be held in memory.
+    The file is memory-mapped, so the chunks fed to zlib are slices of the mapping instead of copies.
+    """
+    CHUNK_SIZE = 1 << 18
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._pos = 1  # Skip 1st byte version header
+        self._decompressor = zlib.decompressobj()
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # zlib treats max_length=0 as "no limit", which would inflate the whole rest at once
+        if not len(buffer):
+            return 0
+        while not self._decompressor.eof:
+            if not self._pending:
+                self._pending = self._view[self._pos:self._pos + self.CHUNK_SIZE]
+                self._pos += len(self._pending)
+                if not self._pending:
+                    raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
+            data = self._decompressor.decompress(self._pending, len(buffer))
+            self._pending = self._decompressor.unconsumed_tail
+            if data:
+                buffer[:len(data)] = data
+                return len(data)
+        return 0
+
+    def close(self):
+        if not self.closed:
+            # The mapping can only be closed once no memoryview of it is left
+            self._pending = b""
+            self._view.release()
+            self._mmap.close()
+        super().close()
+
+def is_compressed(header):
+    """
+    Tells an .archipelago file (format version byte, then a zlib stream)
+    apart from an already decompressed pickle by its first two bytes.
+    """
+    # Pickles from protocol 2 on start with the PROTO opcode, zlib streams with 0x78
+    return len(header) >= 2 and header[0] != 0x80 and header[1] == 0x78
 
 # --- Helper: Data Resolution ---
 def resolve_player_info(slot_obj, slot_id):
-    p_name = "Unknown"
-    p_game = "Unknown"
-
-    # Strategy 1: Standard Attributes
-    if hasattr(slot_obj, 'name') and slot_obj.name: p_name = slot_obj.name
-    if hasattr(slot_obj, 'game') and slot_obj.game: p_game = slot_obj.game
-
-    # Strategy 2: __new__ arguments (Likely for NetworkSlot)
-    if p_name == "Unknown":
-        new_args = getattr(slot_obj, '_new_args', None)
-        if new_args and len(new_args) >= 2:
-            p_name = new_args[0]
-            p_game = new_args[1]
-
-    # Strategy 3: State Dict
-    if p_name == "Unknown":
-        state = getattr(slot_obj, '_state', None)
-        if isinstance(state, dict):
-            p_name = state.get('name', p_name)
-            p_game = state.get('game', p_game)
+    # PlaceholderObject sets name/game from the constructor arguments (NetworkSlot)
+    # and the pickled state, so the attributes are enough for almost every slot
+    p_name = getattr(slot_obj, 'name', None)
+    p_game = getattr(slot_obj, 'game', None) or "Unknown"
+    if p_name:
+        return p_name, p_game
+
+    # The state can overwrite a constructor name with an empty one, fall back to the arguments then
+    new_args = getattr(slot_obj, '_new_args', None)
+    if new_args and len(new_args) >= 2:
+        return new_args[0], new_args[1]
+
+    state = getattr(slot_obj, '_state', None)
+    if isinstance(state, dict):
+        return state.get('name', "Unknown"), state.get('game', p_game)
+    return "Unknown", p_game
+
+# Below this size NumPy's call overhead costs more than the faster sort or lookup saves
+NUMPY_SORT_THRESHOLD = 256
+
+def sorted_ids(ids):
+    """Sorts a collection of integer IDs into a list, using NumPy for large ones if it is installed."""
+    if np is None or len(ids) < NUMPY_SORT_THRESHOLD:
+        return sorted(ids)
+    arr = np.fromiter(ids, dtype=np.int64, count=len(ids))
+    arr.sort()
+    return arr.tolist()
+
+def location_names(location_ids, loc_map):
+    """
+    Sorts the location IDs and returns their names in that order.
+    IDs missing from loc_map are named "Unknown ID <id>".
+    """
+    loc_ids = sorted_ids(location_ids)
+    # Look up all names in C, then only format the (rare) unknown IDs in Python
+    loc_names = list(map(loc_map.get, loc_ids))
+    if None in loc_names:
+        loc_names = [loc_name if loc_name is not None else f"Unknown ID {loc_id}"
+                     for loc_id, loc_name in zip(loc_ids, loc_names)]
+    return loc_names
+
+class LocationTable:
+    """
+    The location names of one game as a sorted NumPy array of IDs and a list of names in the same order.
+    Takes far less memory than an { ID: name } dict for games with thousands of locations.
+    """
+    __slots__ = ('ids', 'names')
 
-    return p_name, p_game
+    def __init__(self, name_to_id):
+        ids = np.fromiter(name_to_id.values(), dtype=np.int64, count=len(name_to_id))
+        order = ids.argsort()
+        self.ids = ids[order]
+        names = list(name_to_id)
+        self.names = [names[i] for i in order.tolist()]
+
+    def lookup(self, location_ids):
+        """Same as location_names(), using one binary search over all IDs instead of a hash probe per ID."""
+        loc_ids = np.fromiter(location_ids, dtype=np.int64, count=len(location_ids))
+        loc_ids.sort()
+        positions = np.searchsorted(self.ids, loc_ids)
+        # IDs past the last known one get position len(ids), clip so they can be compared
+        found = self.ids[np.minimum(positions, len(self.ids) - 1)] == loc_ids
+        names = self.names
+        return [names[pos] if is_found else f"Unknown ID {loc_id}"
+                for pos, is_found, loc_id in zip(positions.tolist(), found.tolist(), loc_ids.tolist())]
+
+def build_location_db(datapackage, games):
+    """
+    Inverts location_name_to_id for the given games only.
+    Returns { GameName: { LocationID: 'LocationName' } },
+    or a LocationTable instead of the dict for large games if NumPy is installed.
+    """
+    location_db = {}
+    for game_name in games:
+        game_data = datapackage.get(game_name)
+        if game_data and game_data.get('location_name_to_id'):
+            name_to_id = game_data['location_name_to_id']
+            if np is not None and len(name_to_id) >= NUMPY_SORT_THRESHOLD:
+                location_db[game_name] = LocationTable(name_to_id)
+            else:
+                # Location IDs are unique per game, so zipping values to keys inverts the map in C
+                location_db[game_name] = dict(zip(name_to_id.values(), name_to_id.keys()))
+    return location_db
+
+def render_player_block(player_id, location_ids, p_info, loc_map):
+    """Returns (player_id, number of locations, report text) for one player's Sphere 1 locations."""
+    if isinstance(loc_map, LocationTable):
+        loc_names = loc_map.lookup(location_ids)
+    else:
+        loc_names = location_names(location_ids, loc_map)
+    block = f"  Player: {p_info['name']} ({p_info['game']})\n"
+    if loc_names:
+        block += "    - " + "\n    - ".join(loc_names) + "\n"
+    return player_id, len(location_ids), block + "\n"
+
+# --- Index Cache ---
+# Everything the report needs, saved next to the input so re-runs skip the unpickle.
+# The index is stored as its own pickle with a CRC32, so a damaged cache is detected
+# and rebuilt instead of silently producing a wrong report.
+INDEX_CACHE_VERSION = 2
+
+def load_index_cache(cache_path, file_stat):
+    """
+    Returns the cached index for the input file, or None when there is no cache
+    or it was made for a different version of the file.
+    A broken cache is never fatal, it only means the file gets unpickled again.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            meta, payload = pickle.load(f)
+        if (meta.get('version') != INDEX_CACHE_VERSION
+                or meta.get('mtime') != file_stat.st_mtime_ns
+                or meta.get('size') != file_stat.st_size
+                or meta.get('crc') != zlib.crc32(payload)):
+            return None
+        index = pickle.loads(payload)
+        if (isinstance(index.get('loc'), dict)
+                and isinstance(index.get('pl'), dict)
+                and isinstance(index.get('sphere_one'), dict)
+                and isinstance(index.get('sphere_count'), int)):
+            return index
+    # A damaged file can fail in many ways (TypeError, MemoryError, ...), as can a cache
+    # holding LocationTables when NumPy is unavailable now
+    except Exception:
+        pass
+    return None
+
+def save_index_cache(cache_path, file_stat, index):
+    """Writes the index next to the input file. A failed write only costs the speedup on the next run."""
+    try:
+        # Pickling can fail too, e.g. for a slot name that is an instance of a placeholder class
+        payload = pickle.dumps(index, protocol=5)
+        meta = {'version': INDEX_CACHE_VERSION, 'mtime': file_stat.st_mtime_ns, 'size': file_stat.st_size,
+                'crc': zlib.crc32(payload)}
+        with open(cache_path, 'wb') as f:
+            pickle.dump((meta, payload), f, protocol=5)
+    except Exception as e:
+        print(f"Warning: Could not write index cache: {e}")
+
+def build_index(file_path, header):
+    """
+    Unpickles the archipelago file and reduces it to what the report uses.
+    Returns None (after printing why) if the file can't be used.
+    """
+    try:
+        if is_compressed(header):
+            with io.BufferedReader(ZlibStream(file_path), buffer_size=1 << 20) as stream:
+                data = SafeUnpickler(stream).load()
+        else:
+            print("No zlib header found. Trying to read as raw pickle (in case it was already decompressed)...")
+            # The C unpickler reads whole frames from the file, no need to copy it into a BytesIO first
+            with open(file_path, 'rb', buffering=1 << 20) as f:
+                data = SafeUnpickler(f).load()
+        print("Unpickling successful.")
+    except Exception as e:
+        print(f"Error unpickling data: {e}")
+        return None
+
+    if 'spheres' not in data:
+        print("Error: 'spheres' key not found in data.")
+        return None
+
+    # Keep only the parts the report reads and drop the rest of the multiworld
+    # (later spheres, hints, precollected items, ...) before building the tables
+    spheres_data = data['spheres']
+    sphere_count = len(spheres_data)
+    sphere_one = spheres_data[0] if spheres_data else {}
+    slot_info = data.get('slot_info', {})
+    datapackage = data.get('datapackage', {})
+    del data, spheres_data
+
+    print("Mapping Player IDs...")
+    player_db = {}
+    for slot_id, slot_obj in slot_info.items():
+        p_name, p_game = resolve_player_info(slot_obj, slot_id)
+        player_db[slot_id] = {'name': p_name, 'game': p_game}
+    del slot_info
+
+    # Only Sphere 1 gets translated, so only its games need their location names
+    print("Mapping Location IDs...")
+    needed_games = {player_db[player_id]['game'] if player_id in player_db else 'Unknown'
+                    for player_id in sphere_one}
+    location_db = build_location_db(datapackage, needed_games)
+
+    return {
+        'loc': location_db,
+        'pl': player_db,
+        'sphere_one': sphere_one,
+        'sphere_count': sphere_count,
+    }
 
 # --- Main Extraction Logic ---
 def process_archipelago_file(file_path):
@@ -100,97 +347,84 @@ def process_archipelago_file(file_path):
     print(f"Processing: {file_path}")
     
     try:
-        # 1. Read and Decompress
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
-
-        if not raw_data:
+        # 1. Check the file
+        file_stat = os.stat(file_path)
+        file_size = file_stat.st_size
+        if not file_size:
             print("Error: File is empty.")
             return
 
         # Verify it looks like an archipelago file (or at least has data)
-        print(f"File size: {len(raw_data)} bytes")
-        
-        # Decompress (Skip 1st byte version header)
-        try:
-            decompressed_data = zlib.decompress(raw_data[1:])
-        except zlib.error:
-            print("Zlib decompression failed. Trying to read as raw pickle (in case it was already decompressed)...")
-            decompressed_data = raw_data
-
-        # 2. Unpickle
-        try:
-            file_buffer = io.BytesIO(decompressed_data)
-            data = SafeUnpickler(file_buffer).load()
-            print("Unpickling successful.")
-        except Exception as e:
-            print(f"Error unpickling data: {e}")
-            return
+        print(f"File size: {file_size} bytes")
 
-        if 'spheres' not in data:
-            print("Error: 'spheres' key not found in data.")
-            return
+        with open(file_path, 'rb') as f:
+            header = f.read(2)
 
-        # 3. Build Databases
-        print("Mapping Location IDs...")
-        location_db = {} 
-        if 'datapackage' in data:
-            for game_name, game_data in data['datapackage'].items():
-                if 'location_name_to_id' in game_data:
-                    name_to_id = game_data['location_name_to_id']
-                    id_to_name = {v: k for k, v in name_to_id.items()}
-                    location_db[game_name] = id_to_name
-
-        print("Mapping Player IDs...")
-        player_db = {} 
-        if 'slot_info' in data:
-            for slot_id, slot_obj in data['slot_info'].items():
-                p_name, p_game = resolve_player_info(slot_obj, slot_id)
-                player_db[slot_id] = {'name': p_name, 'game': p_game}
-
-        # 4. Generate Report
-        spheres_data = data['spheres']
+        # 2. Load the index cache, or Decompress, Unpickle and Build Databases
         base_name = os.path.splitext(file_path)[0]
+        cache_path = f"{base_name}_idx.pkl"
+        index = load_index_cache(cache_path, file_stat)
+        from_cache = index is not None
+        if from_cache:
+            print(f"Using cached index: {cache_path}")
+        else:
+            index = build_index(file_path, header)
+            if index is None:
+                return
+
+        location_db = index['loc']
+        player_db = index['pl']
+        sphere_one = index['sphere_one']
+        sphere_count = index['sphere_count']
+
+        # 3. Generate Report
         output_file = f"{base_name}_spheres_readable.txt"
         
-        print(f"Translating {len(spheres_data)} spheres to text...")
-
-        with open(output_file, "w", encoding="utf-8") as out:
-            out.write(f"=== READABLE SPHERES REPORT ===\n")
-            out.write(f"Source: {os.path.basename(file_path)}\n")
-            out.write(f"Total Spheres: {len(spheres_data)}\n")
-            out.write("="*60 + "\n\n")
-
-            count_dict = {}
-            for i, sphere in enumerate(spheres_data):
-                out.write(f"--- Sphere {i + 1} ---\n")
-                if not sphere:
-                    out.write("  (Empty Sphere)\n")
-                    continue
-                if i != 0:
-                    break  # Only process Sphere 1 for check counts
-                for player_id in sorted(sphere.keys()):
-                    location_ids = sphere[player_id]
-                    p_info = player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
-                    count_dict[player_id] = 0
-
-                    out.write(f"  Player: {p_info['name']} ({p_info['game']})\n")
-                    
-                    loc_map = location_db.get(p_info['game'], {})
-                    for loc_id in sorted(location_ids):
-                        loc_name = loc_map.get(loc_id, f"Unknown ID {loc_id}")
-                        out.write(f"    - {loc_name}\n")
-                        count_dict[player_id] += 1
-                    out.write("\n")
-                out.write("\n")
-                sorted_count = sorted(count_dict.items(), key=lambda x: x[1], reverse=True)
-            out.write("=== SPHERE 1 CHECK COUNT RANKING ===\n")
-            for player_id, count in sorted_count:
-                p_info = player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
-                out.write(f"  Player: {p_info['name']} ({p_info['game']}), Checks: {count}\n")
+        print(f"Translating {sphere_count} spheres to text...")
+
+        # Collect the whole report and write (and encode) it in one go
+        parts = []
+        append = parts.append
+        append(f"=== READABLE SPHERES REPORT ===\n")
+        append(f"Source: {os.path.basename(file_path)}\n")
+        append(f"Total Spheres: {sphere_count}\n")
+        append("="*60 + "\n\n")
+
+        # Only Sphere 1 is needed for the check counts
+        count_dict = {}
+        append("--- Sphere 1 ---\n")
+        if not sphere_one:
+            append("  (Empty Sphere)\n")
+        else:
+            player_ids = sorted_ids(sphere_one.keys())
+            p_infos = [player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
+                       for player_id in player_ids]
+            # Players are independent of each other, map() still returns their blocks in player order
+            with ThreadPoolExecutor() as executor:
+                blocks = executor.map(render_player_block, player_ids,
+                                      [sphere_one[player_id] for player_id in player_ids], p_infos,
+                                      [location_db.get(p_info['game'], {}) for p_info in p_infos])
+                for player_id, count, block in blocks:
+                    count_dict[player_id] = count
+                    append(block)
+            append("\n")
+
+        sorted_count = sorted(count_dict.items(), key=lambda x: x[1], reverse=True)
+        append("=== SPHERE 1 CHECK COUNT RANKING ===\n")
+        for player_id, count in sorted_count:
+            p_info = player_db.get(player_id, {'name': f"Player {player_id}", 'game': 'Unknown'})
+            append(f"  Player: {p_info['name']} ({p_info['game']}), Checks: {count}\n")
+
+        # Encode once and write the bytes directly, skipping the TextIOWrapper layer
+        with open(output_file, "wb") as out:
+            out.write("".join(parts).encode("utf-8"))
 
         print(f"SUCCESS: Report generated: {output_file}")
 
+        # Only cache the index once the report is safely written
+        if not from_cache:
+            save_index_cache(cache_path, file_stat, index)
+
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         import traceback
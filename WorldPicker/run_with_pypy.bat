@@ -0,0 +1,11 @@
+@echo off
+rem Runs WorldPicker.py with PyPy if it is installed, falling back to the regular Python 3.
+rem Usage: drag and drop the .archipelago file onto this script, or run_with_pypy.bat <your_file.archipelago>
+
+where pypy3 >nul 2>nul
+if %ERRORLEVEL% == 0 (
+    pypy3 "%~dp0WorldPicker.py" %*
+) else (
+    echo pypy3 not found, running with py -3 instead.
+    py -3 "%~dp0WorldPicker.py" %*
+)
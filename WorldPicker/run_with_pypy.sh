@@ -0,0 +1,11 @@
+#!/bin/sh
+# Runs WorldPicker.py with PyPy if it is installed, falling back to the regular Python 3.
+# Usage: ./run_with_pypy.sh <your_file.archipelago>
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+
+if command -v pypy3 >/dev/null 2>&1; then
+    exec pypy3 "$SCRIPT_DIR/WorldPicker.py" "$@"
+fi
+
+echo "pypy3 not found, running with python3 instead."
+exec python3 "$SCRIPT_DIR/WorldPicker.py" "$@"